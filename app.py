@@ -1,36 +1,107 @@
-from flask import Flask, render_template, request, redirect, url_for, flash, jsonify
+from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, session, abort, make_response, Response, stream_with_context
+from flask.json.provider import DefaultJSONProvider
+from flask_caching import Cache
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event, Computed, func, select
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.engine import Engine
+from sqlalchemy.schema import CreateTable, CreateIndex
+from sqlalchemy.orm import raiseload, lazyload, deferred, defer, undefer
 from flask_login import LoginManager, UserMixin, login_user, login_required, logout_user, current_user
 from datetime import datetime
+import csv
+import io
+import math
+from functools import lru_cache, wraps
 import os
-from werkzeug.security import generate_password_hash, check_password_hash
+try:
+    import fcntl
+except ImportError: # Windows has no flock; run init unlocked there
+    fcntl = None
+from werkzeug.security import check_password_hash
+from argon2 import PasswordHasher
+from argon2.exceptions import VerifyMismatchError
+import orjson
+
+class ORJSONProvider(DefaultJSONProvider):
+    """Serialise jsonify() responses with orjson, falling back to Flask's type handling."""
+    def dumps(self, obj, **kwargs):
+        option = orjson.OPT_NAIVE_UTC | orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        return orjson.dumps(obj, default=self.default, option=option).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
 
 app = Flask(__name__)
+app.json = ORJSONProvider(app)
 app.config['SECRET_KEY'] = 'your-secret-key-change-this-in-prod' # Change this!
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///aluminium.db'
+app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('SQLALCHEMY_DATABASE_URI', 'sqlite:///aluminium.db')
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+# Reload templates only when debugging; production serves compiled templates from the cache
+app.config['TEMPLATES_AUTO_RELOAD'] = os.environ.get('FLASK_DEBUG') == '1'
+app.jinja_options = {**app.jinja_options, 'cache_size': 1000}
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+    'pool_size': 5,
+    'max_overflow': 10,
+    'pool_pre_ping': True,
+    'connect_args': {'check_same_thread': False, 'timeout': 30},
+}
 
 db = SQLAlchemy(app)
 login_manager = LoginManager()
 login_manager.init_app(app)
 login_manager.login_view = 'admin_login'
+cache = Cache(app, config={'CACHE_TYPE': 'SimpleCache', 'CACHE_DEFAULT_TIMEOUT': 120})
+
+# Tuned for roughly 250ms per verify on a small instance.
+ph = PasswordHasher(time_cost=3, memory_cost=64 * 1024, parallelism=2)
+
+# Checked against when the username doesn't exist, so a failed login costs
+# the same whether or not the account is real.
+DUMMY_HASH = ph.hash("!")
+
+@event.listens_for(Engine, "connect")
+def set_sqlite_pragma(dbapi_connection, connection_record):
+    """Use WAL so readers don't block on the writer, and keep pooled connections warm."""
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA busy_timeout=5000")
+    cursor.execute("PRAGMA cache_size=-64000")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.close()
 
 # --- Models ---
 class Admin(UserMixin, db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    username = db.Column(db.String(100), unique=True, nullable=False)
-    password_hash = db.Column(db.String(200), nullable=False)
+    username = db.Column(db.String(100), unique=True, nullable=False, index=True)
+    password_hash = db.Column(db.String(255), nullable=False)
 
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = ph.hash(password)
 
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        """Verify the password, re-hashing in place if the stored hash is outdated."""
+        if not self.password_hash.startswith('$argon2'):
+            # Legacy Werkzeug PBKDF2 hash from before the argon2 switch
+            if not check_password_hash(self.password_hash, password):
+                return False
+            self.set_password(password)
+            return True
+        try:
+            ph.verify(self.password_hash, password)
+        except VerifyMismatchError:
+            return False
+        if ph.check_needs_rehash(self.password_hash):
+            self.set_password(password)
+        return True
 
 class Category(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
-    products = db.relationship('Product', backref='category', lazy=True)
+    products = db.relationship('Product', back_populates='category', lazy='selectin')
 
 class Product(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -38,7 +109,9 @@ class Product(db.Model):
     description = db.Column(db.Text, nullable=True)
     image_url = db.Column(db.String(200), nullable=True)
     price_per_sqft = db.Column(db.Float, nullable=False)
-    category_id = db.Column(db.Integer, db.ForeignKey('category.id'), nullable=False)
+    category_id = db.Column(db.Integer, db.ForeignKey('category.id'), nullable=False, index=True)
+
+    category = db.relationship('Category', back_populates='products')
 
 class LaborCost(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -50,109 +123,217 @@ class MaterialRate(db.Model):
     value = db.Column(db.Float, nullable=False)
     label = db.Column(db.String(100))
 
+INVOICE_SIZE_CHECK = 'height_ft > 0 AND width_ft > 0 AND quantity > 0'
+
 class Invoice(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     customer_name = db.Column(db.String(100), nullable=False)
     customer_phone = db.Column(db.String(20), nullable=False)
-    customer_address = db.Column(db.Text, nullable=False)
-    product_id = db.Column(db.Integer, db.ForeignKey('product.id'), nullable=False)
+    customer_address = deferred(db.Column(db.Text, nullable=False)) # Only shown on the invoice page
+    product_id = db.Column(db.Integer, db.ForeignKey('product.id'), nullable=False, index=True)
     product_name = db.Column(db.String(100)) # Store snapshot of name
     height_ft = db.Column(db.Float, nullable=False)
     width_ft = db.Column(db.Float, nullable=False)
     quantity = db.Column(db.Integer, nullable=False)
     sqft_price_at_booking = db.Column(db.Float, nullable=False) # Snapshot of price
-    total_amount = db.Column(db.Float, nullable=False)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    total_amount = db.Column(db.Float, Computed('height_ft * width_ft * sqft_price_at_booking * quantity', persisted=True))
+    created_at = db.Column(db.DateTime(timezone=True), server_default=func.now(), nullable=False) # Indexed via ix_invoice_created_desc
 
     product = db.relationship('Product')
 
+    # Matches the dashboard listing order
+    __table_args__ = (
+        db.Index('ix_invoice_created_desc', created_at.desc(), id.desc()),
+        db.CheckConstraint(INVOICE_SIZE_CHECK, name='ck_invoice_positive_size'),
+    )
+
+
+@lru_cache(maxsize=128)
+def _load_admin(uid):
+    admin = db.session.get(Admin, uid)
+    if admin is not None:
+        db.session.expunge(admin)
+    return admin
 
 @login_manager.user_loader
 def load_user(user_id):
-    return Admin.query.get(int(user_id))
+    # The cached instance stays detached; each request merges a copy into its own session
+    admin = _load_admin(int(user_id))
+    return db.session.merge(admin, load=False) if admin else None
 
 # --- Database Initialization ---
 def init_database():
     """Initialize database tables and create default admin if needed."""
-    with app.app_context():
+    # Serialise first-time setup between processes sharing the database
+    os.makedirs(app.instance_path, exist_ok=True)
+    with open(os.path.join(app.instance_path, 'init-db.lock'), 'w') as lock_file, app.app_context():
+        if fcntl:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        _upgrade_invoice_table()
         db.create_all()
-        # Create default admin if not exists
-        if not Admin.query.filter_by(username='admin').first():
-            print("Creating default admin...")
-            admin = Admin(username='admin')
-            admin.set_password('admin123')
-            db.session.add(admin)
-        
-        # Initialize Labor Cost if not exists
-        if not LaborCost.query.first():
-            db.session.add(LaborCost(rate_per_sqft=50.0))
-        
-        # Initialize Material Rates (Always check and add missing ones)
-        default_rates = [
-            ('alu_color', 410.0, 'Aluminum Color (Rs/kg)'),
-            ('alu_silver', 360.0, 'Aluminum Silver (Rs/kg)'),
-            ('glass', 45.0, 'Glass (Rs/sqft)'),
-            ('glass_rubber', 10.0, 'Glass Rubber (Rs/ft)'),
-            ('track_rubber', 80.0, 'Track Rubber (Rs/window)'),
-            ('mosquito_net', 10.0, 'Mosquito Net (Rs/sqft)'),
-            ('u_channel', 100.0, 'U-Channel (Rs/window)'),
-            ('screw', 80.0, 'Screw (Rs/window)'),
-            ('lock', 170.0, 'Lock (Rs/unit)'),
-            ('bearing', 10.0, 'Bearing (Rs/unit)'),
-            ('labour_min', 350.0, 'Labour Minimum (Rs)'),
-            ('labour_sqft', 24.0, 'Labour (Rs/sqft)')
-        ]
-        for key, val, label in default_rates:
-            if not MaterialRate.query.filter_by(key=key).first():
-                db.session.add(MaterialRate(key=key, value=val, label=label))
-        
+        # create_all skips tables that already exist, so add any missing indexes
+        for table in db.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(bind=db.engine, checkfirst=True)
+
+        _seed_defaults()
         db.session.commit()
         print("Database initialized successfully.")
 
-# Initialize database on startup
-init_database()
+def _upgrade_invoice_table():
+    """Rebuild an invoice table created before total_amount became a generated column
+    and created_at gained its database default.
+
+    SQLite can't change a column definition in place, so the rows are copied into a
+    freshly created table and the old one is dropped, all in one transaction.
+    """
+    raw = db.engine.raw_connection()
+    conn = raw.driver_connection
+    saved_isolation = conn.isolation_level
+    # pysqlite commits DDL on its own; take over so BEGIN/COMMIT span the whole rebuild
+    conn.isolation_level = None
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            _rebuild_invoice_table(conn)
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+    finally:
+        conn.isolation_level = saved_isolation
+        raw.close()
+
+def _rebuild_invoice_table(conn):
+    tables = {name for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    if 'invoice_old' in tables:
+        raise RuntimeError("Found table invoice_old left by an interrupted invoice upgrade. "
+                           "Move its rows back into invoice by hand, then drop it.")
+    columns = {row[1]: row for row in conn.execute("PRAGMA table_xinfo(invoice)")}
+    if not columns:
+        return
+    # hidden == 3 marks a stored generated column; created_at needs NOT NULL and a default
+    created_at = columns['created_at']
+    if columns['total_amount'][6] == 3 and created_at[3] and created_at[4] is not None:
+        return
+    print("Upgrading invoice table...")
+    conn.execute("ALTER TABLE invoice RENAME TO invoice_old")
+    # Indexes follow the renamed table; drop them so the new table can reuse the names
+    old_indexes = conn.execute("SELECT name FROM sqlite_master "
+                               "WHERE type = 'index' AND tbl_name = 'invoice_old' AND sql IS NOT NULL")
+    for (name,) in old_indexes.fetchall():
+        conn.execute('DROP INDEX "%s"' % name)
+    # Older versions accepted zero or negative sizes; set those rows aside rather than fail the copy
+    invalid = "NOT (%s)" % INVOICE_SIZE_CHECK
+    bad_ids = [i for (i,) in conn.execute("SELECT id FROM invoice_old WHERE %s" % invalid)]
+    if bad_ids:
+        print("Moving invoices with a non-positive size to invoice_quarantine: %s" % ', '.join(map(str, bad_ids)))
+        conn.execute("CREATE TABLE IF NOT EXISTS invoice_quarantine AS SELECT * FROM invoice_old WHERE 0")
+        conn.execute("INSERT INTO invoice_quarantine SELECT * FROM invoice_old WHERE %s" % invalid)
+        conn.execute("DELETE FROM invoice_old WHERE %s" % invalid)
+    table = Invoice.__table__
+    conn.execute(str(CreateTable(table).compile(dialect=db.engine.dialect)))
+    for index in table.indexes:
+        conn.execute(str(CreateIndex(index).compile(dialect=db.engine.dialect)))
+    copied = [c.name for c in table.columns if c.computed is None]
+    selected = ['COALESCE(created_at, CURRENT_TIMESTAMP)' if name == 'created_at' else name for name in copied]
+    conn.execute("INSERT INTO invoice (%s) SELECT %s FROM invoice_old" % (', '.join(copied), ', '.join(selected)))
+    conn.execute("DROP TABLE invoice_old")
+
+def _seed_defaults():
+    """Insert the default admin, labor cost and material rates, leaving existing rows alone."""
+    # Check first so the argon2 hash is only computed when the admin actually needs creating
+    if not db.session.query(Admin.id).filter_by(username='admin').first():
+        db.session.execute(insert(Admin).values(username='admin', password_hash=ph.hash('admin123'))
+                           .on_conflict_do_nothing(index_elements=['username']))
+    # The app reads a single labor cost row; don't assume it has id 1
+    if not db.session.query(LaborCost.id).first():
+        db.session.add(LaborCost(rate_per_sqft=50.0))
+
+    # Initialize Material Rates (Always check and add missing ones)
+    default_rates = [
+        ('alu_color', 410.0, 'Aluminum Color (Rs/kg)'),
+        ('alu_silver', 360.0, 'Aluminum Silver (Rs/kg)'),
+        ('glass', 45.0, 'Glass (Rs/sqft)'),
+        ('glass_rubber', 10.0, 'Glass Rubber (Rs/ft)'),
+        ('track_rubber', 80.0, 'Track Rubber (Rs/window)'),
+        ('mosquito_net', 10.0, 'Mosquito Net (Rs/sqft)'),
+        ('u_channel', 100.0, 'U-Channel (Rs/window)'),
+        ('screw', 80.0, 'Screw (Rs/window)'),
+        ('lock', 170.0, 'Lock (Rs/unit)'),
+        ('bearing', 10.0, 'Bearing (Rs/unit)'),
+        ('labour_min', 350.0, 'Labour Minimum (Rs)'),
+        ('labour_sqft', 24.0, 'Labour (Rs/sqft)')
+    ]
+    db.session.execute(insert(MaterialRate).on_conflict_do_nothing(index_elements=['key']),
+                       [{'key': key, 'value': val, 'label': label} for key, val, label in default_rates])
 
 # --- CLI Commands ---
 @app.cli.command("create-admin")
 def create_admin():
-    """Creates the admin user."""
-    db.create_all()
-    if not Admin.query.filter_by(username='admin').first():
-        admin = Admin(username='admin')
-        admin.set_password('admin123')
-        db.session.add(admin)
-        
-        # Initialize Labor Cost if not exists
-        if not LaborCost.query.first():
-            db.session.add(LaborCost(rate_per_sqft=50.0))
-            
-        db.session.commit()
-        print("Admin user created.")
-    else:
-        print("Admin already exists.")
+    """Creates the admin user. Kept as an alias of init-db."""
+    init_database()
 
 @app.cli.command("init-db")
 def init_db_command():
-    """Clear existing data and create new tables."""
-    db.create_all()
-    print("Initialized the database.")
+    """Create tables and seed default data."""
+    init_database()
+
+# --- Page Cache ---
+def skip_page_cache():
+    """Admins and visitors with pending flash messages see a personalised page."""
+    return current_user.is_authenticated or '_flashes' in session
+
+def product_cache_key():
+    return 'product_%s' % request.view_args['product_id']
+
+# Kept short like the page caches: SimpleCache is per worker, so other workers
+# only see a rate change once their copy expires
+@cache.memoize(timeout=300)
+def get_labor_rate():
+    labor_cost = LaborCost.query.first()
+    return labor_cost.rate_per_sqft if labor_cost else 0.0
+
+def invalidate_public_pages(product_ids=()):
+    cache.delete('home')
+    cache.delete_many(*('product_%s' % pid for pid in product_ids))
+
+def public_response(body, max_age):
+    """Add HTTP caching headers and a strong ETag to a rendered public page."""
+    resp = make_response(body)
+    if skip_page_cache():
+        resp.headers['Cache-Control'] = 'private, no-cache'
+    else:
+        resp.headers['Cache-Control'] = 'public, max-age=%d' % max_age
+    resp.vary.add('Cookie')
+    resp.add_etag()
+    return resp
+
+def conditional(view):
+    """Answer If-None-Match with a 304. Applied outside the page cache so 304s are never cached."""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        return make_response(view(*args, **kwargs)).make_conditional(request)
+    return wrapper
 
 # --- Routes ---
 
 # Public Routes
 @app.route('/')
+@conditional
+@cache.cached(timeout=120, key_prefix='home', unless=skip_page_cache)
 def home():
-    categories = Category.query.all()
-    # Fetch some featured products or all products
-    products = Product.query.all()
-    return render_template('index.html', categories=categories, products=products)
+    with db.session.no_autoflush:
+        # Category.products is selectin-loaded, which is all the template iterates
+        categories = Category.query.all()
+    return public_response(render_template('index.html', categories=categories), 120)
 
 @app.route('/product/<int:product_id>')
+@conditional
+@cache.cached(timeout=300, key_prefix=product_cache_key, unless=skip_page_cache)
 def product_detail(product_id):
-    product = Product.query.get_or_404(product_id)
-    labor_cost = LaborCost.query.first()
-    labor_rate = labor_cost.rate_per_sqft if labor_cost else 0
-    return render_template('product.html', product=product, labor_rate=labor_rate)
+    product = db.get_or_404(Product, product_id)
+    return public_response(render_template('product.html', product=product, labor_rate=get_labor_rate()), 120)
 
 # Admin Routes
 @app.route('/admin/login', methods=['GET', 'POST'])
@@ -164,8 +345,18 @@ def admin_login():
         username = request.form.get('username')
         password = request.form.get('password')
         admin = Admin.query.filter_by(username=username).first()
+        if admin:
+            ok = admin.check_password(password or "")
+        else:
+            try:
+                ph.verify(DUMMY_HASH, password or "")
+            except VerifyMismatchError:
+                pass
+            ok = False
         
-        if admin and admin.check_password(password):
+        if admin and ok:
+            db.session.commit() # Persist any re-hashed password
+            _load_admin.cache_clear()
             login_user(admin)
             return redirect(url_for('admin_dashboard'))
         else:
@@ -182,15 +373,22 @@ def admin_logout():
 @app.route('/admin')
 @login_required
 def admin_dashboard():
-    categories = Category.query.all()
-    products = Product.query.all()
-    labor_cost = LaborCost.query.first()
-    invoices = Invoice.query.order_by(Invoice.created_at.desc()).all()
-    material_rates = {r.key: r for r in MaterialRate.query.all()}
+    with db.session.no_autoflush:
+        # Only category names are shown here, so skip the selectin load of their products
+        categories = Category.query.options(lazyload(Category.products)).all()
+        products = Product.query.options(defer(Product.description)).all()
+        # Surface any new lazy load on the invoice list as an error while developing
+        invoice_options = [raiseload('*')] if app.debug else []
+        invoices = Invoice.query.options(*invoice_options) \
+            .order_by(Invoice.created_at.desc(), Invoice.id.desc()) \
+            .paginate(page=request.args.get('page', 1, type=int), per_page=25, error_out=False)
+        material_rates = {r.key: r for r in MaterialRate.query.all()}
+        # Read directly so admins always see the current rate
+        labor_cost = LaborCost.query.first()
     return render_template('admin/dashboard.html', 
                          categories=categories, 
                          products=products, 
-                         labor_cost=labor_cost,
+                         labor_rate=labor_cost.rate_per_sqft if labor_cost else 0,
                          invoices=invoices,
                          material_rates=material_rates)
 
@@ -203,10 +401,9 @@ def admin_calculator():
 @app.route('/admin/rates/update', methods=['POST'])
 @login_required
 def update_rates():
+    rates = {r.key: r for r in MaterialRate.query.all()}
     for key, value in request.form.items():
-        if key == 'redirect_to':
-            continue
-        rate = MaterialRate.query.filter_by(key=key).first()
+        rate = rates.get(key)
         if rate:
             try:
                 rate.value = float(value)
@@ -229,6 +426,7 @@ def add_category():
     if name:
         db.session.add(Category(name=name))
         db.session.commit()
+        invalidate_public_pages()
     return redirect(url_for('admin_dashboard'))
 
 @app.route('/admin/product/add', methods=['POST'])
@@ -244,6 +442,7 @@ def add_product():
                       description=description, image_url=image_url)
     db.session.add(product)
     db.session.commit()
+    invalidate_public_pages()
     return redirect(url_for('admin_dashboard'))
 
 @app.route('/admin/labor/update', methods=['POST'])
@@ -257,66 +456,73 @@ def update_labor():
     else:
         labor.rate_per_sqft = rate
     db.session.commit()
+    cache.delete_memoized(get_labor_rate)
+    # Every product page shows the labour rate
+    invalidate_public_pages(pid for (pid,) in db.session.query(Product.id))
     return redirect(url_for('admin_dashboard'))
 
 @app.route('/admin/invoice/create', methods=['POST'])
 @login_required
 def create_invoice():
-    try:
-        product_id = int(request.form.get('product_id'))
-        customer_name = request.form.get('customer_name')
-        customer_phone = request.form.get('customer_phone')
-        customer_address = request.form.get('customer_address')
-        height = float(request.form.get('height'))
-        width = float(request.form.get('width'))
-        quantity = int(request.form.get('quantity'))
-        
-        product = Product.query.get(product_id)
-        if not product:
-            flash("Product not found")
-            return redirect(url_for('admin_dashboard'))
-
-        # Calculate total
-        sqft = height * width
-        total = sqft * product.price_per_sqft * quantity
-        
-        invoice = Invoice(
-            customer_name=customer_name,
-            customer_phone=customer_phone,
-            customer_address=customer_address,
-            product_id=product_id,
-            product_name=product.name,
-            height_ft=height,
-            width_ft=width,
-            quantity=quantity,
-            sqft_price_at_booking=product.price_per_sqft,
-            total_amount=total
-        )
-        db.session.add(invoice)
-        db.session.commit()
-        
-        return redirect(url_for('view_invoice', invoice_id=invoice.id))
-    except Exception as e:
-        flash(str(e))
+    product_id = request.form.get('product_id', type=int)
+    customer_name = request.form.get('customer_name')
+    customer_phone = request.form.get('customer_phone')
+    customer_address = request.form.get('customer_address')
+    height = request.form.get('height', type=float)
+    width = request.form.get('width', type=float)
+    quantity = request.form.get('quantity', type=int)
+    if None in (product_id, height, width, quantity) or not (customer_name and customer_phone and customer_address):
+        abort(400)
+    if not (math.isfinite(height) and math.isfinite(width)) or height <= 0 or width <= 0 or quantity <= 0:
+        abort(400)
+    
+    product = db.session.get(Product, product_id)
+    if not product:
+        flash("Product not found")
         return redirect(url_for('admin_dashboard'))
 
+    invoice = Invoice(
+        customer_name=customer_name,
+        customer_phone=customer_phone,
+        customer_address=customer_address,
+        product_id=product_id,
+        product_name=product.name,
+        height_ft=height,
+        width_ft=width,
+        quantity=quantity,
+        sqft_price_at_booking=product.price_per_sqft
+    )
+    db.session.add(invoice)
+    db.session.commit()
+    
+    return redirect(url_for('view_invoice', invoice_id=invoice.id))
+
 @app.route('/admin/invoice/<int:invoice_id>')
 @login_required
 def view_invoice(invoice_id):
-    invoice = Invoice.query.get_or_404(invoice_id)
+    invoice = db.session.get(Invoice, invoice_id, options=[undefer(Invoice.customer_address)]) or abort(404)
     return render_template('admin/invoice_view.html', invoice=invoice, now=datetime.utcnow())
 
-if __name__ == '__main__':
-    with app.app_context():
-        db.create_all()
-        # Create default admin if not exists (for dev convenience)
-        if not Admin.query.filter_by(username='admin').first():
-            print("Creating default admin...")
-            admin = Admin(username='admin')
-            admin.set_password('admin123')
-            db.session.add(admin)
-            if not LaborCost.query.first():
-                 db.session.add(LaborCost(rate_per_sqft=50.0))
-            db.session.commit()
-            
-    app.run(debug=True)
+@app.route('/admin/invoices/export.csv')
+@login_required
+def export_invoices():
+    columns = [Invoice.id, Invoice.created_at, Invoice.customer_name, Invoice.customer_phone,
+               Invoice.customer_address, Invoice.product_name, Invoice.height_ft, Invoice.width_ft,
+               Invoice.quantity, Invoice.sqft_price_at_booking, Invoice.total_amount]
+    # Rows are fetched in batches and written out as they arrive, so memory stays flat
+    query = select(*columns).order_by(Invoice.created_at.desc(), Invoice.id.desc()) \
+        .execution_options(yield_per=500)
+
+    def generate():
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow([c.key for c in columns])
+        for row in db.session.execute(query):
+            writer.writerow(row)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        yield buffer.getvalue()
+
+    return Response(stream_with_context(generate()), mimetype='text/csv',
+                    headers={'Content-Disposition': 'attachment; filename=invoices.csv'})
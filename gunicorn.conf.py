@@ -0,0 +1,7 @@
+def on_starting(server):
+    """Create and upgrade the database once in the master, before any worker forks."""
+    from app import app, db, init_database
+    init_database()
+    # Workers are forked from the master; don't let them inherit its SQLite connections
+    with app.app_context():
+        db.engine.dispose()
@@ -0,0 +1,70 @@
+import os
+import sqlite3
+import tempfile
+
+import pytest
+
+DB_PATH = os.path.join(tempfile.mkdtemp(), 'aluminium.db')
+os.environ['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + DB_PATH
+
+from app import app, db, init_database  # noqa: E402
+
+# Invoice table as created by the app before total_amount became a generated column
+BASELINE_INVOICE = """
+CREATE TABLE invoice (
+    id INTEGER NOT NULL,
+    customer_name VARCHAR(100) NOT NULL,
+    customer_phone VARCHAR(20) NOT NULL,
+    customer_address TEXT NOT NULL,
+    product_id INTEGER NOT NULL,
+    product_name VARCHAR(100),
+    height_ft FLOAT NOT NULL,
+    width_ft FLOAT NOT NULL,
+    quantity INTEGER NOT NULL,
+    sqft_price_at_booking FLOAT NOT NULL,
+    total_amount FLOAT NOT NULL,
+    created_at DATETIME,
+    PRIMARY KEY (id)
+)
+"""
+
+
+@pytest.fixture
+def baseline_db():
+    with app.app_context():
+        db.engine.dispose()
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(DB_PATH + suffix):
+            os.remove(DB_PATH + suffix)
+    conn = sqlite3.connect(DB_PATH)
+    conn.execute(BASELINE_INVOICE)
+    conn.executemany("INSERT INTO invoice VALUES (?, 'Name', '123', 'Addr', 1, 'Window', ?, 3.0, ?, 10.0, 0, ?)", [
+        (1, 2.0, 1, '2024-01-01 00:00:00.000000'),
+        (2, 0.0, 1, '2024-01-02 00:00:00.000000'),  # zero height, accepted by old versions
+        (3, 2.0, 2, None),
+    ])
+    conn.commit()
+    yield conn
+    conn.close()
+    with app.app_context():
+        db.engine.dispose()
+
+
+def test_upgrade_quarantines_rows_failing_size_check(baseline_db):
+    init_database()
+
+    rows = baseline_db.execute("SELECT id, total_amount, created_at IS NOT NULL FROM invoice ORDER BY id").fetchall()
+    assert rows == [(1, 60.0, 1), (3, 120.0, 1)]
+    assert baseline_db.execute("SELECT id FROM invoice_quarantine").fetchall() == [(2,)]
+    tables = {name for (name,) in baseline_db.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    assert 'invoice_old' not in tables
+
+
+def test_upgrade_refuses_leftover_invoice_old(baseline_db):
+    baseline_db.execute("CREATE TABLE invoice_old AS SELECT * FROM invoice")
+    baseline_db.commit()
+
+    with pytest.raises(RuntimeError, match='invoice_old'):
+        init_database()
+
+    assert baseline_db.execute("SELECT COUNT(*) FROM invoice_old").fetchone() == (3,)